@@ -1,6 +1,6 @@
 """Allow running as python -m prompt_manager_cli."""
 
-from prompt_manager_cli.cli import app
+from prompt_manager_cli.cli import main
 
 if __name__ == "__main__":
-    app()
+    raise SystemExit(main())
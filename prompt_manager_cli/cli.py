@@ -1,49 +1,66 @@
 """CLI for prompt-manager-cli."""
 
+import argparse
 import os
-import subprocess
 import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
-
-import typer
-from rich.console import Console
+from typing import List, Optional
 
 from prompt_manager_cli import __version__
 from prompt_manager_cli.utils import (
     DEFAULT_TEMPLATE,
     copy_to_clipboard,
-    format_iso_timestamp,
+    format_time_parts,
     generate_filename,
     get_git_short_hash,
     get_local_timestamp,
     load_template,
-    render_template,
-    resolve_unique_filepath,
-)
-
-app = typer.Typer(
-    name="pm",
-    help="A CLI tool to create and organize prompt files for code agents.",
-    add_completion=False,
-    no_args_is_help=True,
+    read_text_if_exists,
+    render_template_bytes,
+    write_new_file,
+    write_unique_file,
 )
-console = Console()
 
 DEFAULT_DIR = ".pm/prompts"
 
 
-def get_editor() -> Optional[str]:
+# ANSI styles, only emitted when stdout is a terminal
+_USE_COLOR = sys.stdout.isatty() and "NO_COLOR" not in os.environ
+_GREEN = "\x1b[32m"
+_YELLOW = "\x1b[33m"
+_BLUE = "\x1b[34m"
+_BOLD_RED = "\x1b[1;31m"
+_DIM = "\x1b[2m"
+_RESET = "\x1b[0m"
+
+
+def _style(text: str, style: str) -> str:
+    """Wrap text in an ANSI style if color output is enabled."""
+    if not _USE_COLOR:
+        return text
+    return f"{style}{text}{_RESET}"
+
+
+def _echo(line: str) -> None:
+    """Write a single line to stdout."""
+    sys.stdout.write(f"{line}\n")
+
+
+@lru_cache(maxsize=1)
+def get_editor(cwd: Optional[Path] = None) -> Optional[str]:
     """Get the configured editor.
 
     Priority:
     1. .pm/editor (local/repo config)
     2. $PM_EDITOR environment variable
+
+    The result is cached for the lifetime of the process.
     """
     # Check local config
-    local_editor = Path.cwd() / ".pm" / "editor"
-    if local_editor.is_file():
-        editor = local_editor.read_text().strip()
+    local_editor = read_text_if_exists((cwd or Path.cwd()) / ".pm" / "editor")
+    if local_editor:
+        editor = local_editor.strip()
         if editor:
             return editor
 
@@ -51,120 +68,137 @@ def get_editor() -> Optional[str]:
     return os.environ.get("PM_EDITOR")
 
 
-def version_callback(value: bool) -> None:
-    """Print the version and exit."""
-    if value:
-        console.print(f"pm version {__version__}")
-        raise typer.Exit()
-
-
-@app.callback()
-def callback(
-    version: Optional[bool] = typer.Option(
-        None,
-        "--version",
-        "-v",
-        callback=version_callback,
-        is_eager=True,
-        help="Show version and exit.",
-    ),
-) -> None:
-    """A CLI tool to create and organize prompt files for code agents."""
-    pass
-
-
-@app.command("init")
-def init() -> None:
+def init() -> int:
     """Initialize .pm directory with default template."""
     try:
         pm_dir = Path.cwd() / ".pm"
         template_file = pm_dir / "template.md"
 
-        if template_file.exists():
-            console.print(f"[yellow]Already exists:[/yellow] {template_file}")
-            raise typer.Exit(code=0)
-
         pm_dir.mkdir(parents=True, exist_ok=True)
-        template_file.write_text(DEFAULT_TEMPLATE)
-        console.print(f"[green]Created:[/green] {template_file}")
+        try:
+            write_new_file(template_file, DEFAULT_TEMPLATE.encode("utf-8"))
+        except FileExistsError:
+            _echo(f"{_style('Already exists:', _YELLOW)} {template_file}")
+            return 0
+        _echo(f"{_style('Created:', _GREEN)} {template_file}")
+        return 0
 
-    except typer.Exit:
-        raise
     except Exception as e:
-        console.print(f"[red]Error:[/red] {e}", style="bold red")
-        raise typer.Exit(code=1)
+        _echo(_style(f"Error: {e}", _BOLD_RED))
+        return 1
 
 
-@app.command("new")
-def new(
-    editor: Optional[str] = typer.Argument(
-        None,
-        help="Editor to open the file with. Overrides config and environment.",
-    ),
-    dir: Optional[Path] = typer.Option(
-        None,
-        "--dir",
-        "-d",
-        help=f"Output directory for the prompt file. Default: {DEFAULT_DIR}",
-    ),
-) -> None:
+def new(editor: Optional[str] = None, dir: Optional[Path] = None) -> int:
     """Create a new prompt file and open it in your editor."""
     try:
+        cwd = Path.cwd()
+
         # Determine output directory
-        output_dir = Path(dir) if dir else Path.cwd() / DEFAULT_DIR
+        output_dir = Path(dir) if dir else cwd / DEFAULT_DIR
 
-        # Ensure directory exists
-        output_dir.mkdir(parents=True, exist_ok=True)
+        # Ensure directory exists; after the first run it usually does, and a
+        # single stat is cheaper than mkdir failing with EEXIST plus a stat
+        if not output_dir.is_dir():
+            output_dir.mkdir(parents=True, exist_ok=True)
 
         # Get timestamp and git hash
         now = get_local_timestamp()
+        time_part, created_at = format_time_parts(now)
         git_hash = get_git_short_hash()
 
-        # Generate filename and resolve collisions
-        base_filename = generate_filename(now, git_hash)
-        filepath = resolve_unique_filepath(output_dir, base_filename)
-
         # Load template and render content
-        template = load_template()
-        content = render_template(
+        template = load_template(cwd)
+        content = render_template_bytes(
             template=template,
-            created_at=format_iso_timestamp(now),
+            created_at=created_at,
             git_hash=git_hash,
-            cwd=str(Path.cwd().absolute()),
+            cwd=str(cwd),
         )
-        filepath.write_text(content)
+
+        # Generate filename and create the file, resolving collisions
+        base_filename = generate_filename(time_part, git_hash)
+        filepath = write_unique_file(output_dir, base_filename, content)
 
         # Print success message
-        console.print(f"[green]Created:[/green] {filepath}")
+        _echo(f"{_style('Created:', _GREEN)} {filepath}")
 
         # Determine editor: argument > config > environment
-        resolved_editor = editor or get_editor()
+        resolved_editor = editor or get_editor(cwd)
 
         # Open in editor
         if resolved_editor:
+            import subprocess
+
             subprocess.run([resolved_editor, str(filepath)])
         else:
-            console.print(
-                "[dim]Tip: Set your editor in .pm/editor or $PM_EDITOR[/dim]"
-            )
+            _echo(_style("Tip: Set your editor in .pm/editor or $PM_EDITOR", _DIM))
 
         # Copy relative path to clipboard
         try:
-            relative_path = filepath.relative_to(Path.cwd())
+            relative_path = filepath.relative_to(cwd)
         except ValueError:
             relative_path = filepath
         if copy_to_clipboard(str(relative_path)):
-            console.print(f"[blue]Copied to clipboard:[/blue] {relative_path}")
+            _echo(f"{_style('Copied to clipboard:', _BLUE)} {relative_path}")
+        return 0
 
     except Exception as e:
-        console.print(f"[red]Error:[/red] {e}", style="bold red")
-        raise typer.Exit(code=1)
+        _echo(_style(f"Error: {e}", _BOLD_RED))
+        return 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for the pm command."""
+    parser = argparse.ArgumentParser(
+        prog="pm",
+        description="A CLI tool to create and organize prompt files for code agents.",
+    )
+    parser.add_argument(
+        "-v",
+        "--version",
+        action="version",
+        version=f"pm version {__version__}",
+        help="Show version and exit.",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    init_parser = subparsers.add_parser(
+        "init",
+        help="Initialize .pm directory with default template.",
+        description="Initialize .pm directory with default template.",
+    )
+    init_parser.set_defaults(handler=lambda args: init())
+
+    new_parser = subparsers.add_parser(
+        "new",
+        help="Create a new prompt file and open it in your editor.",
+        description="Create a new prompt file and open it in your editor.",
+    )
+    new_parser.add_argument(
+        "editor",
+        nargs="?",
+        help="Editor to open the file with. Overrides config and environment.",
+    )
+    new_parser.add_argument(
+        "-d",
+        "--dir",
+        type=Path,
+        help=f"Output directory for the prompt file. Default: {DEFAULT_DIR}",
+    )
+    new_parser.set_defaults(handler=lambda args: new(editor=args.editor, dir=args.dir))
+
+    return parser
 
 
-def main() -> None:
-    """Entry point for the CLI."""
-    app()
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for the CLI. Returns the process exit code."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 0
+    return args.handler(args)
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -1,10 +1,13 @@
 """Utility functions for prompt-manager-cli."""
 
-import subprocess
+import os
+import re
+import string
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import AnyStr, Dict, Iterator, List, Optional, Sequence, Tuple
 
 DEFAULT_TEMPLATE = '''---
 created_at: "{created_at}"
@@ -28,20 +31,113 @@ You are a senior software engineer.
 # Future intentions
 '''
 
+TEMPLATE_VARIABLES = ("created_at", "git_hash", "cwd")
 
+SHORT_HASH_LENGTH = 7
+
+MAX_UNIQUE_ATTEMPTS = 100
+
+# A compiled template field: (name, conversion, format_spec)
+Field = Tuple[str, Optional[str], str]
+CompiledTemplate = Tuple[Tuple[str, ...], Tuple[Field, ...]]
+CompiledTemplateBytes = Tuple[Tuple[bytes, ...], Tuple[Field, ...]]
+
+_FORMATTER = string.Formatter()
+# "{{", "}}", or a {name!conversion:format_spec} field over TEMPLATE_VARIABLES
+_TOKEN_PATTERN = re.compile(
+    r"\{\{|\}\}|\{(" + "|".join(TEMPLATE_VARIABLES) + r")(?:!([rsa]))?(?::([^{}]*))?\}"
+)
+_HASH_PATTERN = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+
+def find_git_dir(start: Optional[Path] = None) -> Optional[Path]:
+    """Find the git directory for start (default: cwd) or its parents.
+
+    Follows "gitdir:" pointer files used by worktrees and submodules. Like
+    git, the search does not move up into a directory listed in
+    $GIT_CEILING_DIRECTORIES. Returns None if no git directory is found.
+    """
+    start = start or Path.cwd()
+    ceilings = {
+        Path(entry)
+        for entry in os.environ.get("GIT_CEILING_DIRECTORIES", "").split(os.pathsep)
+        if os.path.isabs(entry)
+    }
+    for directory in (start, *start.parents):
+        if directory in ceilings and directory != start:
+            break
+        candidate = directory / ".git"
+        if candidate.is_dir():
+            return candidate
+        pointer = read_text_if_exists(candidate)
+        if pointer and pointer.startswith("gitdir:"):
+            return directory / pointer[len("gitdir:"):].strip()
+    return None
+
+
+def _read_ref(git_dir: Path, ref: str) -> Optional[str]:
+    """Read a ref from loose ref files or packed-refs."""
+    common_dir = git_dir
+    commondir = read_text_if_exists(git_dir / "commondir")
+    if commondir:
+        common_dir = git_dir / commondir.strip()
+
+    for refs_dir in (git_dir, common_dir):
+        value = read_text_if_exists(refs_dir / ref)
+        if value is not None:
+            return value.strip()
+
+    packed_refs = read_text_if_exists(common_dir / "packed-refs")
+    if packed_refs:
+        for line in packed_refs.splitlines():
+            object_hash, _, name = line.partition(" ")
+            if name == ref:
+                return object_hash
+    return None
+
+
+def read_head_hash(git_dir: Path) -> Optional[str]:
+    """Resolve HEAD to a full commit hash by reading the git directory.
+
+    Returns None if HEAD cannot be resolved this way, e.g. on an unborn
+    branch or with an unsupported ref storage.
+    """
+    head = read_text_if_exists(git_dir / "HEAD")
+    if head is None:
+        return None
+    head = head.strip()
+    if head.startswith("ref:"):
+        head = _read_ref(git_dir, head[len("ref:"):].strip())
+    if head and _HASH_PATTERN.fullmatch(head):
+        return head
+    return None
+
+
+@lru_cache(maxsize=1)
 def get_git_short_hash() -> str:
     """Get the short git hash of the current repo HEAD.
 
-    Returns 'nogit' if not in a git repository.
+    HEAD is read straight from the git directory; git itself is only run
+    if that fails. The result is cached for the lifetime of the process.
+
+    Returns 'nogit' if not in a git repository, without running git.
     """
+    git_dir = find_git_dir()
+    if git_dir is None:
+        return "nogit"
+
+    head_hash = read_head_hash(git_dir)
+    if head_hash:
+        return head_hash[:SHORT_HASH_LENGTH]
+
+    import subprocess
+
     try:
-        result = subprocess.run(
+        output = subprocess.check_output(
             ["git", "rev-parse", "--short", "HEAD"],
-            capture_output=True,
-            text=True,
-            check=True,
+            stderr=subprocess.DEVNULL,
         )
-        return result.stdout.strip()
+        return output.decode("ascii").strip()
     except (subprocess.CalledProcessError, FileNotFoundError):
         return "nogit"
 
@@ -53,72 +149,235 @@ def get_local_timestamp() -> datetime:
 
 def format_iso_timestamp(dt: datetime) -> str:
     """Format datetime as ISO 8601 with timezone offset."""
-    return dt.isoformat(timespec="seconds")
+    return format_time_parts(dt)[1]
+
+
+@lru_cache(maxsize=8)
+def _format_utc_offset(offset: Optional[timedelta]) -> str:
+    """Format a UTC offset as +HH:MM, or '' for naive datetimes.
+
+    Cached per offset: the local offset only changes across DST switches.
+    """
+    if offset is None:
+        return ""
+    sign = "-" if offset < timedelta(0) else "+"
+    minutes, seconds = divmod(int(abs(offset).total_seconds()), 60)
+    hours, minutes = divmod(minutes, 60)
+    if seconds:
+        return f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+def format_time_parts(dt: datetime) -> Tuple[str, str]:
+    """Format dt for the filename and as an ISO 8601 timestamp in one pass.
+
+    Returns (YYYY-MM-DD-HH-MM, YYYY-MM-DDTHH:MM:SS+HH:MM).
+    """
+    date = f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+    hour, minute = f"{dt.hour:02d}", f"{dt.minute:02d}"
+    filename_time = f"{date}-{hour}-{minute}"
+    offset = _format_utc_offset(dt.utcoffset())
+    iso_timestamp = f"{date}T{hour}:{minute}:{dt.second:02d}{offset}"
+    return filename_time, iso_timestamp
 
 
-def generate_filename(dt: datetime, git_hash: str) -> str:
+def generate_filename(time_part: str, git_hash: str) -> str:
     """Generate the base filename (without collision suffix).
 
-    Format: prompt-YYYY-MM-DD-HH-MM-<git_hash>.md
+    Format: prompt-YYYY-MM-DD-HH-MM-<git_hash>.md, where time_part is the
+    first value returned by format_time_parts.
     """
-    time_part = dt.strftime("%Y-%m-%d-%H-%M")
     return f"prompt-{time_part}-{git_hash}.md"
 
 
 def resolve_unique_filepath(directory: Path, base_filename: str) -> Path:
-    """Find a unique filepath, adding -2, -3, etc. suffix if needed."""
-    filepath = directory / base_filename
-    if not filepath.exists():
-        return filepath
-
-    # Remove .md extension for suffix handling
-    stem = base_filename[:-3]  # Remove ".md"
-    counter = 2
-
-    while True:
-        new_filename = f"{stem}-{counter}.md"
-        filepath = directory / new_filename
-        if not filepath.exists():
-            return filepath
-        counter += 1
+    """Find a unique filepath, adding -2, -3, etc. suffix if needed.
+
+    The directory is listed once and the suffix is one past the highest
+    existing one, instead of probing each candidate with a stat.
+    """
+    stem, ext = os.path.splitext(base_filename)
+    prefix = f"{stem}-"
+    base_taken = False
+    highest = 1
 
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if name == base_filename:
+                    base_taken = True
+                elif name.startswith(prefix) and name.endswith(ext):
+                    suffix = name[len(prefix):len(name) - len(ext)]
+                    if suffix.isascii() and suffix.isdigit():
+                        highest = max(highest, int(suffix))
+    except FileNotFoundError:
+        pass
+
+    if not base_taken:
+        return directory / base_filename
+    return directory / f"{prefix}{highest + 1}{ext}"
+
+
+def write_new_file(path: Path, content: bytes) -> None:
+    """Create path and write content to it, failing if it already exists.
+
+    Creation uses O_EXCL, so the existence check and the create are a
+    single atomic call. Raises FileExistsError if path exists.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    with open(fd, "wb") as f:
+        f.write(content)
 
-def find_template() -> Optional[Path]:
-    """Find a custom template file.
 
-    Search order:
-    1. .pm/template.md in current directory (local/repo template)
-    2. ~/.pm/template.md (global template)
+def write_unique_file(directory: Path, base_filename: str, content: bytes) -> Path:
+    """Create a new file with a unique name and write content to it.
 
-    Returns None if no custom template is found.
+    The file is created with O_EXCL, so a name taken between choosing it and
+    creating it moves on to the next suffix instead of being overwritten.
+    Raises FileExistsError after MAX_UNIQUE_ATTEMPTS taken names, e.g. on a
+    case-insensitive filesystem where the clashing file is listed under a
+    different case. Returns the path of the created file.
     """
-    # Check local template first
-    local_template = Path.cwd() / ".pm" / "template.md"
-    if local_template.is_file():
-        return local_template
+    stem, ext = os.path.splitext(base_filename)
+    filepath = resolve_unique_filepath(directory, base_filename)
+    number = 1 if filepath.name == base_filename else int(filepath.stem[len(stem) + 1:])
 
-    # Check global template
-    global_template = Path.home() / ".pm" / "template.md"
-    if global_template.is_file():
-        return global_template
+    for _ in range(MAX_UNIQUE_ATTEMPTS):
+        try:
+            write_new_file(filepath, content)
+            return filepath
+        except FileExistsError:
+            number += 1
+            filepath = directory / f"{stem}-{number}{ext}"
+    raise FileExistsError(
+        f"No free name for {base_filename} in {directory} "
+        f"after {MAX_UNIQUE_ATTEMPTS} attempts"
+    )
+
+
+def read_text_if_exists(path: Path) -> Optional[str]:
+    """Read a text file, returning None if it is missing or a directory.
+
+    Opening the file directly avoids a separate stat before the read.
+    """
+    try:
+        return path.read_text()
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
 
-    return None
 
+def _template_paths(cwd: Optional[Path] = None) -> Tuple[Path, Path]:
+    """Return the local and global template paths, in search order."""
+    return (
+        (cwd or Path.cwd()) / ".pm" / "template.md",
+        Path.home() / ".pm" / "template.md",
+    )
 
-def load_template() -> str:
+
+@lru_cache(maxsize=1)
+def load_template(cwd: Optional[Path] = None) -> str:
     """Load the template content.
 
-    Uses custom template if found, otherwise returns default.
+    Search order:
+    1. .pm/template.md in cwd, default current directory (local/repo template)
+    2. ~/.pm/template.md (global template)
+
+    Falls back to DEFAULT_TEMPLATE if neither exists. Each candidate is read
+    directly instead of being checked first, and the content is read once
+    per process.
     """
-    template_path = find_template()
-    if template_path:
-        return template_path.read_text()
+    for template_path in _template_paths(cwd):
+        content = read_text_if_exists(template_path)
+        if content is not None:
+            return content
     return DEFAULT_TEMPLATE
 
 
+@lru_cache(maxsize=8)
+def _compile_template(template: str) -> CompiledTemplate:
+    """Split a template into its static parts and the fields between them.
+
+    The template is parsed once; rendering then only joins strings. Each
+    field is (name, conversion, format_spec). "{{" and "}}" become literal
+    braces, and any other brace that does not form a field over
+    TEMPLATE_VARIABLES (a code snippet, an unknown name) is kept verbatim,
+    so one part of a template never changes how another part renders.
+    """
+    statics = []
+    fields = []
+    pending = []
+    position = 0
+    for match in _TOKEN_PATTERN.finditer(template):
+        pending.append(template[position:match.start()])
+        position = match.end()
+        token = match.group()
+        if token in ("{{", "}}"):
+            pending.append(token[0])
+            continue
+        name, conversion, format_spec = match.groups()
+        statics.append("".join(pending))
+        fields.append((name, conversion, format_spec or ""))
+        pending = []
+    pending.append(template[position:])
+    statics.append("".join(pending))
+    return tuple(statics), tuple(fields)
+
+
+@lru_cache(maxsize=8)
+def _compile_template_bytes(template: str) -> CompiledTemplateBytes:
+    """Like _compile_template, with the static parts pre-encoded as UTF-8."""
+    statics, fields = _compile_template(template)
+    return tuple(static.encode("utf-8") for static in statics), fields
+
+
+def _field_values(fields: Sequence[Field], values: Dict[str, str]) -> List[str]:
+    """Look up each field's value, applying its conversion and format spec."""
+    formatted = []
+    for name, conversion, spec in fields:
+        value = values[name]
+        if conversion:
+            value = _FORMATTER.convert_field(value, conversion)
+        if conversion or spec:
+            value = _FORMATTER.format_field(value, spec)
+        formatted.append(value)
+    return formatted
+
+
+def _interleave(
+    statics: Sequence[AnyStr], values: Sequence[AnyStr]
+) -> Iterator[AnyStr]:
+    """Yield static parts alternating with the substituted values."""
+    yield statics[0]
+    for value, static in zip(values, statics[1:]):
+        yield value
+        yield static
+
+
 def render_template(template: str, created_at: str, git_hash: str, cwd: str) -> str:
-    """Render a template with the given variables."""
-    return template.format(created_at=created_at, git_hash=git_hash, cwd=cwd)
+    """Render a template with the given variables.
+
+    {created_at}, {git_hash} and {cwd} are substituted, including with a
+    !conversion or :format_spec. "{{" and "}}" always render as single
+    braces; any other brace text is kept verbatim.
+    """
+    values = {"created_at": created_at, "git_hash": git_hash, "cwd": cwd}
+    statics, fields = _compile_template(template)
+    return "".join(_interleave(statics, _field_values(fields, values)))
+
+
+def render_template_bytes(
+    template: str, created_at: str, git_hash: str, cwd: str
+) -> bytes:
+    """Render a template with the given variables to UTF-8 bytes.
+
+    Only the variables are encoded per render; the static parts are encoded
+    once per template.
+    """
+    statics, fields = _compile_template_bytes(template)
+    values = {"created_at": created_at, "git_hash": git_hash, "cwd": cwd}
+    encoded = [value.encode("utf-8") for value in _field_values(fields, values)]
+    return b"".join(_interleave(statics, encoded))
 
 
 def copy_to_clipboard(text: str) -> bool:
@@ -131,6 +390,8 @@ def copy_to_clipboard(text: str) -> bool:
 
     Returns True if successful, False otherwise.
     """
+    import subprocess
+
     try:
         if sys.platform == "darwin":
             # macOS
@@ -0,0 +1,49 @@
+"""Shared fixtures for prompt-manager-cli tests."""
+
+import subprocess
+
+import pytest
+
+from prompt_manager_cli.cli import get_editor
+from prompt_manager_cli.utils import (
+    DEFAULT_TEMPLATE,
+    get_git_short_hash,
+    load_template,
+    render_template,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    """Reset process-wide caches so each test sees its own filesystem."""
+    get_editor.cache_clear()
+    get_git_short_hash.cache_clear()
+    load_template.cache_clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _no_subprocess(monkeypatch, request):
+    """Fail any test that spawns a real process without mocking it.
+
+    Mark a test with @pytest.mark.allow_subprocess to opt out.
+    """
+    if "allow_subprocess" in request.keywords:
+        return
+
+    def refuse(*args, **kwargs):
+        raise RuntimeError(f"unmocked subprocess call: {args[0] if args else kwargs}")
+
+    monkeypatch.setattr(subprocess, "run", refuse)
+    monkeypatch.setattr(subprocess, "Popen", refuse)
+
+
+@pytest.fixture(scope="session")
+def default_rendered():
+    """The default template rendered once with fixed values."""
+    return render_template(
+        template=DEFAULT_TEMPLATE,
+        created_at="2026-01-05T14:37:00+01:00",
+        git_hash="a1b2c3d",
+        cwd="/home/user/project",
+    )
@@ -1,16 +1,77 @@
 """Tests for CLI commands."""
 
-import os
+import subprocess
+from datetime import datetime, timezone
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 
 import pytest
-from typer.testing import CliRunner
 
-from prompt_manager_cli.cli import app
+from prompt_manager_cli import __version__
+from prompt_manager_cli.cli import get_editor, init, main, new
 from prompt_manager_cli.utils import DEFAULT_TEMPLATE
 
-runner = CliRunner()
+FIXED_NOW = datetime(2026, 1, 5, 14, 37, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def run_calls(monkeypatch, tmp_path):
+    """Run every CLI test in tmp_path with the clock, git, editor and clipboard stubbed.
+
+    The clock is frozen at FIXED_NOW. Returns the list of commands passed to
+    subprocess.run (the editor launch).
+    """
+    monkeypatch.setattr("prompt_manager_cli.cli.Path.cwd", lambda: tmp_path)
+    monkeypatch.setattr("prompt_manager_cli.cli.get_local_timestamp", lambda: FIXED_NOW)
+    monkeypatch.setattr("prompt_manager_cli.cli.get_git_short_hash", lambda: "abc")
+    monkeypatch.setattr("prompt_manager_cli.cli.copy_to_clipboard", lambda text: False)
+    calls = []
+
+    def record_run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0)
+
+    monkeypatch.setattr("subprocess.run", record_run)
+    return calls
+
+
+class TestMain:
+    """Tests for argument parsing in main."""
+
+    def test_prints_help_without_command(self, capsys):
+        """Test that running pm without a command prints help."""
+        exit_code = main([])
+
+        assert exit_code == 0
+        out = capsys.readouterr().out
+        assert "usage: pm" in out
+        assert "init" in out
+        assert "new" in out
+
+    def test_prints_version(self, capsys):
+        """Test that --version prints the version and exits."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(["--version"])
+
+        assert exc_info.value.code == 0
+        assert f"pm version {__version__}" in capsys.readouterr().out
+
+    def test_passes_dir_option_to_new(self, tmp_path):
+        """Test that --dir is parsed into the output directory."""
+        output_dir = tmp_path / "prompts"
+
+        with patch("prompt_manager_cli.cli.new", return_value=0) as mock_new:
+            exit_code = main(["new", "vim", "--dir", str(output_dir)])
+
+        assert exit_code == 0
+        mock_new.assert_called_once_with(editor="vim", dir=output_dir)
+
+    def test_rejects_unknown_command(self):
+        """Test that an unknown command is a usage error."""
+        with pytest.raises(SystemExit) as exc_info:
+            main(["bogus"])
+
+        assert exc_info.value.code == 2
 
 
 class TestNewCommand:
@@ -21,218 +82,188 @@ class TestNewCommand:
         output_dir = tmp_path / "prompts"
         assert not output_dir.exists()
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+        exit_code = new(dir=output_dir)
 
-        assert result.exit_code == 0
+        assert exit_code == 0
         assert output_dir.exists()
 
+    def test_reuses_existing_directory(self, tmp_path):
+        """Test that an existing output directory is used as is."""
+        output_dir = tmp_path / "prompts"
+        output_dir.mkdir()
+
+        with patch("prompt_manager_cli.cli.Path.mkdir") as mock_mkdir:
+            exit_code = new(dir=output_dir)
+
+        assert exit_code == 0
+        mock_mkdir.assert_not_called()
+        assert (output_dir / "prompt-2026-01-05-14-37-abc.md").is_file()
+
     def test_creates_file_with_correct_name_format(self, tmp_path):
         """Test that created file has correct naming format."""
         output_dir = tmp_path / "prompts"
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc1234"):
-                result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+        with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc1234"):
+            exit_code = new(dir=output_dir)
 
-        assert result.exit_code == 0
-        files = list(output_dir.glob("prompt-*.md"))
-        assert len(files) == 1
-        filename = files[0].name
-        assert filename.startswith("prompt-")
-        assert "-abc1234.md" in filename
+        assert exit_code == 0
+        assert (output_dir / "prompt-2026-01-05-14-37-abc1234.md").is_file()
 
-    def test_creates_file_with_correct_content(self, tmp_path):
+    def test_creates_file_with_correct_content(self, tmp_path, default_rendered):
         """Test that created file has correct template content."""
         output_dir = tmp_path / "prompts"
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+        exit_code = new(dir=output_dir)
 
-        assert result.exit_code == 0
-        files = list(output_dir.glob("prompt-*.md"))
-        content = files[0].read_text()
+        assert exit_code == 0
+        content = (output_dir / "prompt-2026-01-05-14-37-abc.md").read_text()
 
-        assert "---" in content
-        assert "created_at:" in content
-        assert "git_hash:" in content
-        assert "cwd:" in content
-        assert "# Goal" in content
-        assert "# Context" in content
-        assert "# Constraints" in content
-        assert "# Acceptance criteria" in content
+        _, frontmatter, body = content.split("---\n", 2)
+        assert "created_at:" in frontmatter
+        assert "git_hash:" in frontmatter
+        assert f'cwd: "{tmp_path}"' in frontmatter
+        assert body == default_rendered.split("---\n", 2)[2]
 
     def test_uses_default_directory(self, tmp_path):
         """Test that default directory is .pm/prompts/."""
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            result = runner.invoke(app, ["new"])
+        exit_code = new()
 
-        assert result.exit_code == 0
-        expected_dir = tmp_path / ".pm" / "prompts"
-        assert expected_dir.exists()
-        files = list(expected_dir.glob("prompt-*.md"))
-        assert len(files) == 1
+        assert exit_code == 0
+        assert (tmp_path / ".pm" / "prompts" / "prompt-2026-01-05-14-37-abc.md").is_file()
 
     def test_handles_filename_collision(self, tmp_path):
         """Test that collision handling works correctly."""
         output_dir = tmp_path / "prompts"
         output_dir.mkdir(parents=True)
+        existing = output_dir / "prompt-2026-01-05-14-37-abc.md"
+        existing.write_text("existing")
 
-        # Create files with same timestamp pattern
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc"):
-                # First file
-                result1 = runner.invoke(app, ["new", "--dir", str(output_dir)])
-                assert result1.exit_code == 0
+        exit_code = new(dir=output_dir)
 
-                # Second file (should get -2 suffix since same minute)
-                result2 = runner.invoke(app, ["new", "--dir", str(output_dir)])
-                assert result2.exit_code == 0
+        assert exit_code == 0
+        assert existing.read_text() == "existing"
+        assert (output_dir / "prompt-2026-01-05-14-37-abc-2.md").is_file()
 
-        all_files = list(output_dir.glob("prompt-*.md"))
-        assert len(all_files) == 2
-        filenames = [f.name for f in all_files]
-        assert any("-2.md" in name for name in filenames)
-
-    def test_prints_success_message(self, tmp_path):
+    def test_prints_success_message(self, tmp_path, capsys):
         """Test that success message is printed."""
         output_dir = tmp_path / "prompts"
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+        exit_code = main(["new", "--dir", str(output_dir)])
 
-        assert result.exit_code == 0
-        assert "Created:" in result.output
+        assert exit_code == 0
+        assert "Created:" in capsys.readouterr().out
 
-    def test_opens_editor_from_argument(self, tmp_path):
+    def test_opens_editor_from_argument(self, tmp_path, run_calls):
         """Test that editor argument opens the specified editor."""
         output_dir = tmp_path / "prompts"
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc"):
-                with patch("prompt_manager_cli.cli.subprocess.run") as mock_run:
-                    result = runner.invoke(app, ["new", "micro", "--dir", str(output_dir)])
+        exit_code = main(["new", "micro", "--dir", str(output_dir)])
 
-        assert result.exit_code == 0
-        mock_run.assert_called_once()
-        call_args = mock_run.call_args[0][0]
+        assert exit_code == 0
+        assert len(run_calls) == 1
+        call_args = run_calls[-1]
         assert call_args[0] == "micro"
         assert call_args[1].endswith(".md")
 
-    def test_opens_editor_from_local_config(self, tmp_path):
+    def test_opens_editor_from_local_config(self, tmp_path, run_calls):
         """Test that editor is read from .pm/editor."""
         output_dir = tmp_path / "prompts"
         pm_dir = tmp_path / ".pm"
         pm_dir.mkdir()
         (pm_dir / "editor").write_text("code")
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc"):
-                with patch("prompt_manager_cli.cli.subprocess.run") as mock_run:
-                    result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+        exit_code = new(dir=output_dir)
 
-        assert result.exit_code == 0
-        mock_run.assert_called_once()
-        call_args = mock_run.call_args[0][0]
+        assert exit_code == 0
+        assert len(run_calls) == 1
+        call_args = run_calls[-1]
         assert call_args[0] == "code"
 
-    def test_local_config_takes_precedence_over_env(self, tmp_path):
-        """Test that .pm/editor takes precedence over $PM_EDITOR."""
-        output_dir = tmp_path / "prompts"
-        pm_dir = tmp_path / ".pm"
-        pm_dir.mkdir()
-        (pm_dir / "editor").write_text("micro")
-
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc"):
-                with patch.dict(os.environ, {"PM_EDITOR": "vim"}):
-                    with patch("prompt_manager_cli.cli.subprocess.run") as mock_run:
-                        result = runner.invoke(app, ["new", "--dir", str(output_dir)])
-
-        assert result.exit_code == 0
-        call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "micro"
-
-    def test_editor_argument_takes_precedence(self, tmp_path):
-        """Test that editor argument takes precedence over config."""
+    @pytest.mark.parametrize(
+        "arg,cfg,env,expected",
+        [
+            (None, "micro", "vim", "micro"),
+            ("nano", "vim", None, "nano"),
+            (None, None, "micro", "micro"),
+        ],
+        ids=["config-over-env", "argument-over-config", "env-fallback"],
+    )
+    def test_editor_precedence(self, tmp_path, run_calls, monkeypatch, arg, cfg, env, expected):
+        """Test that the argument beats .pm/editor, which beats $PM_EDITOR."""
+        if cfg is not None:
+            (tmp_path / ".pm").mkdir()
+            (tmp_path / ".pm" / "editor").write_text(cfg)
+        if env is None:
+            monkeypatch.delenv("PM_EDITOR", raising=False)
+        else:
+            monkeypatch.setenv("PM_EDITOR", env)
+
+        exit_code = new(editor=arg, dir=tmp_path / "prompts")
+
+        assert exit_code == 0
+        assert len(run_calls) == 1
+        assert run_calls[-1][0] == expected
+
+    def test_shows_tip_when_no_editor_configured(self, tmp_path, capsys, run_calls, monkeypatch):
+        """Test that a tip is shown when no editor is configured."""
         output_dir = tmp_path / "prompts"
-        pm_dir = tmp_path / ".pm"
-        pm_dir.mkdir()
-        (pm_dir / "editor").write_text("vim")
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc"):
-                with patch("prompt_manager_cli.cli.subprocess.run") as mock_run:
-                    result = runner.invoke(app, ["new", "nano", "--dir", str(output_dir)])
+        monkeypatch.delenv("PM_EDITOR", raising=False)
+        exit_code = main(["new", "--dir", str(output_dir)])
 
-        assert result.exit_code == 0
-        call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "nano"
+        assert exit_code == 0
+        assert run_calls == []
+        assert "Tip:" in capsys.readouterr().out
 
-    def test_falls_back_to_environment_variable(self, tmp_path):
-        """Test that PM_EDITOR is used if no config exists."""
+    def test_nogit_hash_when_not_in_repo(self, tmp_path):
+        """Test that 'nogit' is used when not in a git repository."""
         output_dir = tmp_path / "prompts"
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc"):
-                with patch.dict(os.environ, {"PM_EDITOR": "micro"}):
-                    with patch("prompt_manager_cli.cli.subprocess.run") as mock_run:
-                        result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+        with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="nogit"):
+            exit_code = new(dir=output_dir)
 
-        assert result.exit_code == 0
-        mock_run.assert_called_once()
-        call_args = mock_run.call_args[0][0]
-        assert call_args[0] == "micro"
+        assert exit_code == 0
+        created = output_dir / "prompt-2026-01-05-14-37-nogit.md"
+        assert created.is_file()
 
-    def test_shows_tip_when_no_editor_configured(self, tmp_path):
-        """Test that a tip is shown when no editor is configured."""
-        output_dir = tmp_path / "prompts"
-
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="abc"):
-                # Clear PM_EDITOR environment variable
-                env = {k: v for k, v in os.environ.items() if k != "PM_EDITOR"}
-                with patch.dict(os.environ, env, clear=True):
-                    with patch("prompt_manager_cli.cli.subprocess.run") as mock_run:
-                        result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+        content = created.read_text()
+        assert 'git_hash: "nogit"' in content
 
-        assert result.exit_code == 0
-        mock_run.assert_not_called()
-        assert "Tip:" in result.output
 
-    def test_nogit_hash_when_not_in_repo(self, tmp_path):
-        """Test that 'nogit' is used when not in a git repository."""
-        output_dir = tmp_path / "prompts"
+class TestGetEditor:
+    """Tests for get_editor function."""
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            with patch("prompt_manager_cli.cli.get_git_short_hash", return_value="nogit"):
-                result = runner.invoke(app, ["new", "--dir", str(output_dir)])
+    def test_caches_editor(self, tmp_path):
+        """Test that .pm/editor is only read once per process."""
+        pm_dir = tmp_path / ".pm"
+        pm_dir.mkdir()
+        editor_file = pm_dir / "editor"
+        editor_file.write_text("micro\n")
 
-        assert result.exit_code == 0
-        files = list(output_dir.glob("prompt-*-nogit.md"))
-        assert len(files) == 1
+        assert get_editor(tmp_path) == "micro"
+        editor_file.write_text("vim\n")
+        assert get_editor(tmp_path) == "micro"
 
-        content = files[0].read_text()
-        assert 'git_hash: "nogit"' in content
+        get_editor.cache_clear()
+        assert get_editor(tmp_path) == "vim"
 
 
 class TestInitCommand:
     """Tests for the 'init' command."""
 
-    def test_creates_template_file(self, tmp_path):
+    def test_creates_template_file(self, tmp_path, capsys):
         """Test that pm init creates .pm/template.md."""
         template_file = tmp_path / ".pm" / "template.md"
         assert not template_file.exists()
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            result = runner.invoke(app, ["init"])
+        exit_code = main(["init"])
 
-        assert result.exit_code == 0
+        assert exit_code == 0
         assert template_file.exists()
         assert template_file.read_text() == DEFAULT_TEMPLATE
-        assert "Created:" in result.output
+        assert "Created:" in capsys.readouterr().out
 
-    def test_does_not_overwrite_existing_template(self, tmp_path):
+    def test_does_not_overwrite_existing_template(self, tmp_path, capsys):
         """Test that pm init does not overwrite existing template."""
         pm_dir = tmp_path / ".pm"
         pm_dir.mkdir()
@@ -240,20 +271,26 @@ class TestInitCommand:
         custom_content = "# My Custom Template"
         template_file.write_text(custom_content)
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            result = runner.invoke(app, ["init"])
+        exit_code = main(["init"])
 
-        assert result.exit_code == 0
+        assert exit_code == 0
         assert template_file.read_text() == custom_content
-        assert "Already exists:" in result.output
+        assert "Already exists:" in capsys.readouterr().out
+
+    def test_colors_output_on_terminal(self, tmp_path, capsys):
+        """Test that labels are wrapped in ANSI colors when enabled."""
+        with patch("prompt_manager_cli.cli._USE_COLOR", True):
+            exit_code = main(["init"])
+
+        assert exit_code == 0
+        assert "\x1b[32mCreated:\x1b[0m" in capsys.readouterr().out
 
     def test_creates_pm_directory_if_missing(self, tmp_path):
         """Test that pm init creates .pm directory if it doesn't exist."""
         pm_dir = tmp_path / ".pm"
         assert not pm_dir.exists()
 
-        with patch("prompt_manager_cli.cli.Path.cwd", return_value=tmp_path):
-            result = runner.invoke(app, ["init"])
+        exit_code = init()
 
-        assert result.exit_code == 0
+        assert exit_code == 0
         assert pm_dir.exists()
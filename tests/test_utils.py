@@ -1,7 +1,8 @@
 """Tests for utility functions."""
 
+import os
 import subprocess
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import patch
 
@@ -9,217 +10,533 @@ import pytest
 
 from prompt_manager_cli.utils import (
     DEFAULT_TEMPLATE,
-    find_template,
+    MAX_UNIQUE_ATTEMPTS,
+    _compile_template,
+    find_git_dir,
     format_iso_timestamp,
+    format_time_parts,
     generate_filename,
     get_git_short_hash,
     load_template,
+    read_head_hash,
+    read_text_if_exists,
     render_template,
+    render_template_bytes,
     resolve_unique_filepath,
+    write_new_file,
+    write_unique_file,
 )
 
 
+HEAD_HASH = "a1b2c3d4e5f60718293a4b5c6d7e8f9012345678"
+
+
+def make_git_dir(root, head="ref: refs/heads/main\n"):
+    """Create a minimal .git directory under root with the given HEAD."""
+    git_dir = root / ".git"
+    git_dir.mkdir(parents=True)
+    (git_dir / "HEAD").write_text(head)
+    return git_dir
+
+
+def _git_stdout(stdout):
+    """Return a subprocess.check_output stand-in that prints stdout."""
+    return lambda args, **kwargs: stdout
+
+
 class TestGetGitShortHash:
     """Tests for get_git_short_hash function."""
 
-    def test_returns_hash_in_git_repo(self):
-        """Test that we get a hash when in a git repo."""
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value.stdout = "a1b2c3d\n"
-            mock_run.return_value.returncode = 0
-            result = get_git_short_hash()
-            assert result == "a1b2c3d"
-            mock_run.assert_called_once_with(
-                ["git", "rev-parse", "--short", "HEAD"],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-
-    def test_returns_nogit_when_not_in_repo(self):
-        """Test that we get 'nogit' when not in a git repository."""
-        with patch("subprocess.run") as mock_run:
-            mock_run.side_effect = subprocess.CalledProcessError(128, "git")
-            result = get_git_short_hash()
-            assert result == "nogit"
-
-    def test_returns_nogit_when_git_not_installed(self):
-        """Test that we get 'nogit' when git is not installed."""
-        with patch("subprocess.run") as mock_run:
-            mock_run.side_effect = FileNotFoundError()
-            result = get_git_short_hash()
-            assert result == "nogit"
+    def test_reads_hash_without_subprocess(self, tmp_path):
+        """Test that HEAD is resolved from the git directory directly."""
+        git_dir = make_git_dir(tmp_path)
+        (git_dir / "refs" / "heads").mkdir(parents=True)
+        (git_dir / "refs" / "heads" / "main").write_text(HEAD_HASH + "\n")
+
+        with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
+            with patch("subprocess.check_output") as mock_check_output:
+                result = get_git_short_hash()
+
+        assert result == "a1b2c3d"
+        mock_check_output.assert_not_called()
+
+    def test_caches_result(self, tmp_path):
+        """Test that the hash is resolved once per process."""
+        make_git_dir(tmp_path, head=HEAD_HASH + "\n")
+
+        with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
+            with patch("prompt_manager_cli.utils.read_head_hash", return_value=HEAD_HASH) as mock_read:
+                assert get_git_short_hash() == "a1b2c3d"
+                assert get_git_short_hash() == "a1b2c3d"
+
+        mock_read.assert_called_once()
+
+    def test_returns_nogit_without_subprocess_outside_repo(self):
+        """Test that git is not run when there is no git directory."""
+        with patch("prompt_manager_cli.utils.find_git_dir", return_value=None):
+            with patch("subprocess.check_output") as mock_check_output:
+                result = get_git_short_hash()
+
+        assert result == "nogit"
+        mock_check_output.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "side_effect,expected",
+        [
+            (_git_stdout(b"a1b2c3d\n"), "a1b2c3d"),
+            (subprocess.CalledProcessError(128, "git"), "nogit"),
+            (FileNotFoundError(), "nogit"),
+        ],
+        ids=["git-succeeds", "git-fails", "git-not-installed"],
+    )
+    def test_falls_back_to_git(self, tmp_path, side_effect, expected):
+        """Test the git rev-parse fallback when HEAD can't be read directly."""
+        make_git_dir(tmp_path)
+        with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
+            with patch("subprocess.check_output", side_effect=side_effect) as mock_check_output:
+                result = get_git_short_hash()
+
+        assert result == expected
+        mock_check_output.assert_called_once_with(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+        )
+
+    def test_runs_git_once_per_process(self, tmp_path):
+        """Test that the git fallback is not re-run on later calls."""
+        make_git_dir(tmp_path)
+        with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
+            with patch(
+                "subprocess.check_output", side_effect=_git_stdout(b"a1b2c3d\n")
+            ) as mock_check_output:
+                assert get_git_short_hash() == "a1b2c3d"
+                assert get_git_short_hash() == "a1b2c3d"
+
+        mock_check_output.assert_called_once()
+
+        get_git_short_hash.cache_clear()
+        with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
+            with patch("subprocess.check_output", side_effect=_git_stdout(b"e5f6a7b\n")):
+                assert get_git_short_hash() == "e5f6a7b"
+
+
+class TestFindGitDir:
+    """Tests for find_git_dir function."""
+
+    def test_finds_git_dir_in_parent(self, tmp_path):
+        """Test that the search walks up to parent directories."""
+        git_dir = make_git_dir(tmp_path)
+        nested = tmp_path / "src" / "pkg"
+        nested.mkdir(parents=True)
+
+        assert find_git_dir(nested) == git_dir
+
+    def test_follows_gitdir_pointer(self, tmp_path):
+        """Test that a .git file pointing elsewhere is followed."""
+        worktree = tmp_path / "worktree"
+        worktree.mkdir()
+        (worktree / ".git").write_text("gitdir: ../repo/.git/worktrees/wt\n")
+
+        assert find_git_dir(worktree) == worktree / "../repo/.git/worktrees/wt"
+
+    def test_returns_none_outside_repo(self, tmp_path, monkeypatch):
+        """Test that None is returned when no git directory exists."""
+        monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path))
+        project = tmp_path / "project"
+        project.mkdir()
+
+        assert find_git_dir(project) is None
+
+    def test_stops_at_ceiling_directory(self, tmp_path, monkeypatch):
+        """Test that the search does not move up into $GIT_CEILING_DIRECTORIES."""
+        make_git_dir(tmp_path)
+        project = tmp_path / "project"
+        (project / "src").mkdir(parents=True)
+        monkeypatch.setenv("GIT_CEILING_DIRECTORIES", f"relative{os.pathsep}{project}")
+
+        assert find_git_dir(project / "src") is None
+        assert find_git_dir(tmp_path) == tmp_path / ".git"
+
+
+class TestReadHeadHash:
+    """Tests for read_head_hash function."""
+
+    def test_detached_head(self, tmp_path):
+        """Test that a detached HEAD hash is returned as is."""
+        git_dir = make_git_dir(tmp_path, head=HEAD_HASH + "\n")
+        assert read_head_hash(git_dir) == HEAD_HASH
+
+    def test_loose_ref(self, tmp_path):
+        """Test that a symbolic HEAD is resolved through the loose ref."""
+        git_dir = make_git_dir(tmp_path)
+        (git_dir / "refs" / "heads").mkdir(parents=True)
+        (git_dir / "refs" / "heads" / "main").write_text(HEAD_HASH + "\n")
+        assert read_head_hash(git_dir) == HEAD_HASH
+
+    def test_packed_ref(self, tmp_path):
+        """Test that a symbolic HEAD is resolved through packed-refs."""
+        git_dir = make_git_dir(tmp_path)
+        (git_dir / "packed-refs").write_text(
+            "# pack-refs with: peeled fully-peeled sorted\n"
+            f"{HEAD_HASH} refs/heads/main\n"
+        )
+        assert read_head_hash(git_dir) == HEAD_HASH
+
+    def test_worktree_uses_common_dir(self, tmp_path):
+        """Test that refs are looked up in the common git directory."""
+        common_dir = make_git_dir(tmp_path)
+        (common_dir / "refs" / "heads").mkdir(parents=True)
+        (common_dir / "refs" / "heads" / "main").write_text(HEAD_HASH + "\n")
+        worktree_dir = common_dir / "worktrees" / "wt"
+        worktree_dir.mkdir(parents=True)
+        (worktree_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        (worktree_dir / "commondir").write_text("../..\n")
+
+        assert read_head_hash(worktree_dir) == HEAD_HASH
+
+    def test_unborn_branch(self, tmp_path):
+        """Test that None is returned when the branch has no commits."""
+        git_dir = make_git_dir(tmp_path)
+        assert read_head_hash(git_dir) is None
+
+    def test_missing_head(self, tmp_path):
+        """Test that None is returned when HEAD does not exist."""
+        assert read_head_hash(tmp_path) is None
 
 
 class TestGenerateFilename:
     """Tests for generate_filename function."""
 
-    def test_generates_correct_format(self):
-        """Test filename format is correct."""
-        dt = datetime(2026, 1, 5, 14, 37, 0)
-        result = generate_filename(dt, "a1b2c3d")
-        assert result == "prompt-2026-01-05-14-37-a1b2c3d.md"
+    @pytest.mark.parametrize(
+        "git_hash,expected",
+        [
+            ("a1b2c3d", "prompt-2026-01-05-14-37-a1b2c3d.md"),
+            ("nogit", "prompt-2026-01-05-14-37-nogit.md"),
+        ],
+    )
+    def test_generates_correct_format(self, git_hash, expected):
+        """Test filename format is correct, with or without a git hash."""
+        assert generate_filename("2026-01-05-14-37", git_hash) == expected
 
-    def test_with_nogit_hash(self):
-        """Test filename with nogit hash."""
-        dt = datetime(2026, 1, 5, 14, 37, 0)
-        result = generate_filename(dt, "nogit")
-        assert result == "prompt-2026-01-05-14-37-nogit.md"
+
+class TestFormatTimeParts:
+    """Tests for format_time_parts function."""
+
+    def test_formats_filename_and_iso_timestamp(self):
+        """Test that both strings are produced from one datetime."""
+        dt = datetime(2026, 1, 5, 14, 37, 12, 123456, tzinfo=timezone.utc)
+        assert format_time_parts(dt) == ("2026-01-05-14-37", "2026-01-05T14:37:12+00:00")
 
     def test_pads_single_digit_values(self):
         """Test that single digit month/day/hour/minute are zero-padded."""
         dt = datetime(2026, 1, 5, 9, 5, 0)
-        result = generate_filename(dt, "abc123")
-        assert result == "prompt-2026-01-05-09-05-abc123.md"
+        filename_time, _ = format_time_parts(dt)
+        assert filename_time == "2026-01-05-09-05"
+
+    @pytest.mark.parametrize(
+        "offset",
+        [timedelta(hours=1), timedelta(hours=-5, minutes=-30), timedelta(0)],
+        ids=["positive", "negative", "utc"],
+    )
+    def test_matches_isoformat(self, offset):
+        """Test that the ISO part matches datetime.isoformat."""
+        dt = datetime(2026, 1, 5, 9, 5, 7, tzinfo=timezone(offset))
+        _, iso_timestamp = format_time_parts(dt)
+        assert iso_timestamp == dt.isoformat(timespec="seconds")
+
+    def test_naive_datetime_has_no_offset(self):
+        """Test that a naive datetime is formatted without an offset."""
+        dt = datetime(2026, 1, 5, 14, 37, 0)
+        _, iso_timestamp = format_time_parts(dt)
+        assert iso_timestamp == "2026-01-05T14:37:00"
+
+
+@pytest.fixture(scope="module")
+def collision_dir(tmp_path_factory):
+    """One base directory shared by the collision tests in this module."""
+    return tmp_path_factory.mktemp("collisions")
+
+
+@pytest.fixture
+def case_dir(collision_dir, request):
+    """A fresh subdirectory of collision_dir for the current test."""
+    directory = collision_dir / request.node.name
+    directory.mkdir()
+    return directory
 
 
 class TestResolveUniqueFilepath:
     """Tests for resolve_unique_filepath function."""
 
-    def test_returns_base_path_when_no_collision(self, tmp_path):
+    def test_returns_base_path_when_no_collision(self, case_dir):
         """Test that we get the base path when there's no collision."""
-        result = resolve_unique_filepath(tmp_path, "prompt-2026-01-05-14-37-abc.md")
-        assert result == tmp_path / "prompt-2026-01-05-14-37-abc.md"
+        result = resolve_unique_filepath(case_dir, "prompt-2026-01-05-14-37-abc.md")
+        assert result == case_dir / "prompt-2026-01-05-14-37-abc.md"
 
-    def test_appends_suffix_on_collision(self, tmp_path):
+    def test_appends_suffix_on_collision(self, case_dir):
         """Test that we get -2 suffix when file exists."""
         # Create existing file
-        (tmp_path / "prompt-2026-01-05-14-37-abc.md").touch()
+        (case_dir / "prompt-2026-01-05-14-37-abc.md").touch()
 
-        result = resolve_unique_filepath(tmp_path, "prompt-2026-01-05-14-37-abc.md")
-        assert result == tmp_path / "prompt-2026-01-05-14-37-abc-2.md"
+        result = resolve_unique_filepath(case_dir, "prompt-2026-01-05-14-37-abc.md")
+        assert result == case_dir / "prompt-2026-01-05-14-37-abc-2.md"
 
-    def test_increments_suffix_for_multiple_collisions(self, tmp_path):
+    def test_increments_suffix_for_multiple_collisions(self, case_dir):
         """Test that suffix increments for multiple collisions."""
         # Create existing files
-        (tmp_path / "prompt-2026-01-05-14-37-abc.md").touch()
-        (tmp_path / "prompt-2026-01-05-14-37-abc-2.md").touch()
-        (tmp_path / "prompt-2026-01-05-14-37-abc-3.md").touch()
+        (case_dir / "prompt-2026-01-05-14-37-abc.md").touch()
+        (case_dir / "prompt-2026-01-05-14-37-abc-2.md").touch()
+        (case_dir / "prompt-2026-01-05-14-37-abc-3.md").touch()
+
+        result = resolve_unique_filepath(case_dir, "prompt-2026-01-05-14-37-abc.md")
+        assert result == case_dir / "prompt-2026-01-05-14-37-abc-4.md"
+
+    def test_continues_after_highest_suffix(self, case_dir):
+        """Test that the suffix follows the highest existing one."""
+        (case_dir / "prompt-2026-01-05-14-37-abc.md").touch()
+        (case_dir / "prompt-2026-01-05-14-37-abc-5.md").touch()
+
+        result = resolve_unique_filepath(case_dir, "prompt-2026-01-05-14-37-abc.md")
+        assert result == case_dir / "prompt-2026-01-05-14-37-abc-6.md"
+
+    def test_ignores_similar_filenames(self, case_dir):
+        """Test that files sharing only a prefix do not count as collisions."""
+        (case_dir / "prompt-2026-01-05-14-37-abcd.md").touch()
+        (case_dir / "prompt-2026-01-05-14-37-abc-2.md.bak").touch()
+
+        result = resolve_unique_filepath(case_dir, "prompt-2026-01-05-14-37-abc.md")
+        assert result == case_dir / "prompt-2026-01-05-14-37-abc.md"
+
+    def test_keeps_other_extensions(self, case_dir):
+        """Test that the suffix goes before any file extension."""
+        (case_dir / "notes.txt").touch()
+        (case_dir / "notes-2.txt").touch()
+        (case_dir / "notes-3.md").touch()
+
+        result = resolve_unique_filepath(case_dir, "notes.txt")
+        assert result == case_dir / "notes-3.txt"
+
+    def test_returns_base_path_when_directory_missing(self, case_dir):
+        """Test that a missing directory yields the base path."""
+        directory = case_dir / "missing"
+        result = resolve_unique_filepath(directory, "prompt-2026-01-05-14-37-abc.md")
+        assert result == directory / "prompt-2026-01-05-14-37-abc.md"
+
+
+class TestWriteNewFile:
+    """Tests for write_new_file function."""
+
+    def test_creates_file(self, tmp_path):
+        """Test that a new file is created with the content."""
+        path = tmp_path / "template.md"
+        write_new_file(path, b"# Template\n")
+        assert path.read_bytes() == b"# Template\n"
+
+    def test_raises_when_file_exists(self, tmp_path):
+        """Test that an existing file is left untouched."""
+        path = tmp_path / "template.md"
+        path.write_text("original")
+
+        with pytest.raises(FileExistsError):
+            write_new_file(path, b"new")
+        assert path.read_text() == "original"
+
+
+class TestWriteUniqueFile:
+    """Tests for write_unique_file function."""
+
+    def test_writes_content_to_base_path(self, tmp_path):
+        """Test that the file is created under the base name."""
+        result = write_unique_file(tmp_path, "prompt-2026-01-05-14-37-abc.md", b"# Hello\n")
+        assert result == tmp_path / "prompt-2026-01-05-14-37-abc.md"
+        assert result.read_text() == "# Hello\n"
+
+    def test_does_not_overwrite_existing_file(self, tmp_path):
+        """Test that an existing file is kept and a suffix is used."""
+        existing = tmp_path / "prompt-2026-01-05-14-37-abc.md"
+        existing.write_text("original")
+
+        result = write_unique_file(tmp_path, "prompt-2026-01-05-14-37-abc.md", b"new")
+        assert result == tmp_path / "prompt-2026-01-05-14-37-abc-2.md"
+        assert existing.read_text() == "original"
+        assert result.read_text() == "new"
+
+    def test_retries_when_name_is_taken_concurrently(self, tmp_path):
+        """Test that a file created after the name was chosen is not overwritten."""
+        base = tmp_path / "prompt-2026-01-05-14-37-abc.md"
+        base.write_text("concurrent")
+
+        with patch("prompt_manager_cli.utils.resolve_unique_filepath", return_value=base):
+            result = write_unique_file(tmp_path, base.name, b"new")
+
+        assert result == tmp_path / "prompt-2026-01-05-14-37-abc-2.md"
+        assert base.read_text() == "concurrent"
+
+    def test_moves_past_name_taken_under_other_case(self, tmp_path):
+        """Test that a clash the directory listing can't see does not loop forever."""
+        (tmp_path / "Prompt-2026-01-05-14-37-abc.md").write_text("other case")
+        taken = {name.lower() for name in os.listdir(tmp_path)}
+        real_open = os.open
+
+        def case_insensitive_open(path, flags, mode=0o777):
+            if os.path.basename(path).lower() in taken:
+                raise FileExistsError(path)
+            return real_open(path, flags, mode)
+
+        with patch("prompt_manager_cli.utils.os.open", side_effect=case_insensitive_open):
+            result = write_unique_file(tmp_path, "prompt-2026-01-05-14-37-abc.md", b"new")
+
+        assert result == tmp_path / "prompt-2026-01-05-14-37-abc-2.md"
+        assert result.read_text() == "new"
 
-        result = resolve_unique_filepath(tmp_path, "prompt-2026-01-05-14-37-abc.md")
-        assert result == tmp_path / "prompt-2026-01-05-14-37-abc-4.md"
+    def test_gives_up_after_max_attempts(self, tmp_path):
+        """Test that a clear error is raised when every candidate is taken."""
+        with patch(
+            "prompt_manager_cli.utils.os.open", side_effect=FileExistsError
+        ) as mock_open:
+            with pytest.raises(FileExistsError, match="No free name"):
+                write_unique_file(tmp_path, "prompt-2026-01-05-14-37-abc.md", b"new")
+
+        assert mock_open.call_count == MAX_UNIQUE_ATTEMPTS
 
 
 class TestFormatIsoTimestamp:
     """Tests for format_iso_timestamp function."""
 
-    def test_formats_with_timezone(self):
-        """Test that ISO timestamp includes timezone offset."""
-        tz = timezone.utc
-        dt = datetime(2026, 1, 5, 14, 37, 0, tzinfo=tz)
-        result = format_iso_timestamp(dt)
-        assert result == "2026-01-05T14:37:00+00:00"
+    @pytest.mark.parametrize("microsecond", [0, 123456], ids=["whole-second", "microseconds"])
+    def test_formats_with_timezone(self, microsecond):
+        """Test that the timestamp has a UTC offset and no microseconds."""
+        dt = datetime(2026, 1, 5, 14, 37, 0, microsecond, tzinfo=timezone.utc)
+        assert format_iso_timestamp(dt) == "2026-01-05T14:37:00+00:00"
+
+
+class TestReadTextIfExists:
+    """Tests for read_text_if_exists function."""
+
+    def test_reads_existing_file(self, tmp_path):
+        """Test that file content is returned."""
+        path = tmp_path / "editor"
+        path.write_text("micro\n")
+        assert read_text_if_exists(path) == "micro\n"
+
+    def test_returns_none_when_missing(self, tmp_path):
+        """Test that None is returned for a missing file."""
+        assert read_text_if_exists(tmp_path / "missing") is None
 
-    def test_excludes_microseconds(self):
-        """Test that microseconds are not included."""
-        tz = timezone.utc
-        dt = datetime(2026, 1, 5, 14, 37, 0, 123456, tzinfo=tz)
-        result = format_iso_timestamp(dt)
-        assert "123456" not in result
-        assert result == "2026-01-05T14:37:00+00:00"
+    def test_returns_none_for_directory(self, tmp_path):
+        """Test that None is returned when the path is a directory."""
+        assert read_text_if_exists(tmp_path) is None
 
 
-class TestFindTemplate:
-    """Tests for find_template function."""
+class TestLoadTemplate:
+    """Tests for load_template function."""
 
-    def test_returns_none_when_no_template_exists(self, tmp_path):
-        """Test that None is returned when no template exists."""
+    def test_returns_default_when_no_custom_template(self, tmp_path):
+        """Test that default template is returned when no custom exists."""
         with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
             with patch("prompt_manager_cli.utils.Path.home", return_value=tmp_path / "home"):
-                result = find_template()
-        assert result is None
+                result = load_template()
 
-    def test_finds_local_template(self, tmp_path):
-        """Test that local template is found."""
+        assert result == DEFAULT_TEMPLATE
+
+    def test_loads_custom_template(self, tmp_path):
+        """Test that custom template content is loaded."""
         local_pm_dir = tmp_path / ".pm"
         local_pm_dir.mkdir()
-        local_template = local_pm_dir / "template.md"
-        local_template.write_text("# Local Template")
+        custom_content = "# Custom\n{created_at}\n{git_hash}\n{cwd}"
+        (local_pm_dir / "template.md").write_text(custom_content)
 
         with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
-            result = find_template()
+            result = load_template()
 
-        assert result == local_template
+        assert result == custom_content
 
-    def test_finds_global_template(self, tmp_path):
-        """Test that global template is found when no local exists."""
+    def test_loads_global_template(self, tmp_path):
+        """Test that the global template is used when no local one exists."""
         home_dir = tmp_path / "home"
         global_pm_dir = home_dir / ".pm"
         global_pm_dir.mkdir(parents=True)
-        global_template = global_pm_dir / "template.md"
-        global_template.write_text("# Global Template")
+        (global_pm_dir / "template.md").write_text("# Global Template")
 
         with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
             with patch("prompt_manager_cli.utils.Path.home", return_value=home_dir):
-                result = find_template()
+                result = load_template()
 
-        assert result == global_template
+        assert result == "# Global Template"
 
     def test_local_template_takes_precedence(self, tmp_path):
-        """Test that local template is preferred over global."""
-        # Create local template
+        """Test that the local template is preferred over the global one."""
         local_pm_dir = tmp_path / ".pm"
         local_pm_dir.mkdir()
-        local_template = local_pm_dir / "template.md"
-        local_template.write_text("# Local Template")
+        (local_pm_dir / "template.md").write_text("# Local Template")
 
-        # Create global template
         home_dir = tmp_path / "home"
         global_pm_dir = home_dir / ".pm"
         global_pm_dir.mkdir(parents=True)
-        global_template = global_pm_dir / "template.md"
-        global_template.write_text("# Global Template")
+        (global_pm_dir / "template.md").write_text("# Global Template")
 
         with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
             with patch("prompt_manager_cli.utils.Path.home", return_value=home_dir):
-                result = find_template()
-
-        assert result == local_template
+                result = load_template()
 
+        assert result == "# Local Template"
 
-class TestLoadTemplate:
-    """Tests for load_template function."""
+    def test_ignores_template_directory(self, tmp_path):
+        """Test that a directory named template.md is skipped."""
+        (tmp_path / ".pm" / "template.md").mkdir(parents=True)
 
-    def test_returns_default_when_no_custom_template(self, tmp_path):
-        """Test that default template is returned when no custom exists."""
         with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
             with patch("prompt_manager_cli.utils.Path.home", return_value=tmp_path / "home"):
                 result = load_template()
 
         assert result == DEFAULT_TEMPLATE
 
-    def test_loads_custom_template(self, tmp_path):
-        """Test that custom template content is loaded."""
+    def test_caches_template_content(self, tmp_path):
+        """Test that the template is only read once per process."""
         local_pm_dir = tmp_path / ".pm"
         local_pm_dir.mkdir()
-        custom_content = "# Custom\n{created_at}\n{git_hash}\n{cwd}"
-        (local_pm_dir / "template.md").write_text(custom_content)
+        template_file = local_pm_dir / "template.md"
+        template_file.write_text("# First")
 
         with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
-            result = load_template()
+            first = load_template()
+            template_file.write_text("# Second")
+            second = load_template()
 
-        assert result == custom_content
+        assert first == second == "# First"
+
+        load_template.cache_clear()
+        with patch("prompt_manager_cli.utils.Path.cwd", return_value=tmp_path):
+            assert load_template() == "# Second"
+
+
+DEFAULT_SECTIONS = (
+    "# Actor",
+    "# Context and goals",
+    "# Tools, APIs, docs and keys",
+    "# Constraints and guidelines",
+    "# Success metrics",
+    "# Future intentions",
+)
 
 
 class TestRenderTemplate:
     """Tests for render_template function."""
 
-    def test_renders_default_template(self):
+    def test_renders_default_template(self, default_rendered):
         """Test that default template renders correctly."""
-        result = render_template(
-            template=DEFAULT_TEMPLATE,
-            created_at="2026-01-05T14:37:00+01:00",
-            git_hash="a1b2c3d",
-            cwd="/home/user/project",
-        )
-        assert "---" in result
-        assert 'created_at: "2026-01-05T14:37:00+01:00"' in result
-        assert 'git_hash: "a1b2c3d"' in result
-        assert 'cwd: "/home/user/project"' in result
-        assert "# Goal" in result
-        assert "# Context" in result
-        assert "# Constraints" in result
-        assert "# Acceptance criteria" in result
+        assert default_rendered.startswith("---\n")
+        assert 'created_at: "2026-01-05T14:37:00+01:00"' in default_rendered
+        assert 'git_hash: "a1b2c3d"' in default_rendered
+        assert 'cwd: "/home/user/project"' in default_rendered
+        for section in DEFAULT_SECTIONS:
+            assert f"\n{section}\n" in default_rendered
+
+    def test_default_template_compiles(self):
+        """Test that the default template splits around its three variables."""
+        statics, fields = _compile_template(DEFAULT_TEMPLATE)
+        assert [name for name, _, _ in fields] == ["created_at", "git_hash", "cwd"]
+        assert len(statics) == 4
 
     def test_renders_custom_template(self):
         """Test that custom template renders correctly."""
@@ -231,3 +548,92 @@ class TestRenderTemplate:
             cwd="/projects/myapp",
         )
         assert result == "Date: 2026-01-05T14:37:00+01:00\nHash: abc123\nDir: /projects/myapp"
+
+    def test_renders_escaped_braces(self):
+        """Test that doubled braces render as literal braces."""
+        result = render_template(
+            template="{{literal}} {git_hash}",
+            created_at="2026-01-05T14:37:00+01:00",
+            git_hash="abc123",
+            cwd="/projects/myapp",
+        )
+        assert result == "{literal} abc123"
+
+    def test_renders_format_spec(self):
+        """Test that fields with a format spec are still rendered."""
+        result = render_template(
+            template="[{git_hash:>8}]",
+            created_at="2026-01-05T14:37:00+01:00",
+            git_hash="abc123",
+            cwd="/projects/myapp",
+        )
+        assert result == "[  abc123]"
+
+    def test_renders_conversion(self):
+        """Test that fields with a conversion are still rendered."""
+        result = render_template(
+            template="{git_hash!r}",
+            created_at="2026-01-05T14:37:00+01:00",
+            git_hash="abc123",
+            cwd="/projects/myapp",
+        )
+        assert result == "'abc123'"
+
+    def test_keeps_unknown_fields_literal(self):
+        """Test that unknown fields are left as is instead of failing."""
+        result = render_template(
+            template="{unknown} {git_hash}",
+            created_at="2026-01-05T14:37:00+01:00",
+            git_hash="abc123",
+            cwd="/projects/myapp",
+        )
+        assert result == "{unknown} abc123"
+
+    def test_keeps_code_braces_literal(self):
+        """Test that braces from code snippets do not break rendering."""
+        template = 'Dir: {cwd}\n```js\nconst x = { a: 1 };\nfunction f() {}\n```'
+        result = render_template(
+            template=template,
+            created_at="2026-01-05T14:37:00+01:00",
+            git_hash="abc123",
+            cwd="/projects/myapp",
+        )
+        assert result == 'Dir: /projects/myapp\n```js\nconst x = { a: 1 };\nfunction f() {}\n```'
+
+    def test_escapes_do_not_depend_on_other_braces(self):
+        """Test that doubled braces render the same with a code snippet elsewhere."""
+        result = render_template(
+            template="{{x}} {git_hash!r} function f() {}",
+            created_at="2026-01-05T14:37:00+01:00",
+            git_hash="abc123",
+            cwd="/projects/myapp",
+        )
+        assert result == "{x} 'abc123' function f() {}"
+
+    @pytest.mark.parametrize(
+        "template",
+        ["{{{git_hash}}}", "{{git_hash}}", "[{cwd:^20}] {created_at!s}", "}}{{"],
+    )
+    def test_matches_str_format(self, template):
+        """Test that valid format strings render exactly as str.format would."""
+        values = {
+            "created_at": "2026-01-05T14:37:00+01:00",
+            "git_hash": "abc123",
+            "cwd": "/projects/myapp",
+        }
+        assert render_template(template, **values) == template.format(**values)
+
+
+class TestRenderTemplateBytes:
+    """Tests for render_template_bytes function."""
+
+    def test_matches_encoded_render_template(self):
+        """Test that the bytes equal the UTF-8 encoded str render."""
+        kwargs = dict(
+            created_at="2026-01-05T14:37:00+01:00",
+            git_hash="a1b2c3d",
+            cwd="/home/usér/prøject",
+        )
+        for template in (DEFAULT_TEMPLATE, "Dir: {cwd} ✓", "[{git_hash:>8}]", "{cwd} {}"):
+            expected = render_template(template=template, **kwargs).encode("utf-8")
+            assert render_template_bytes(template=template, **kwargs) == expected